@@ -1,38 +1,57 @@
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime
-import json
 import os
 import re
 import stat
 
 import xxhash
 
-from .utils import datetime_from_iso_format
+from .utils import datetime_from_iso_format, json_dumps, json_loads
+
+
+_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+# Whether files and symlinks can be opened relative to their parent directory's descriptor.
+_SUPPORTS_DIR_FD = os.open in os.supports_dir_fd and os.readlink in os.supports_dir_fd
+_HAS_FADVISE = hasattr(os, 'posix_fadvise')
+_NAME_RE = re.compile(r'\A[A-Za-z0-9_\-.]+\Z')
 
 
 class TreeNode:
     """
     Provides a base class for various other data storage methods, viz files, directories, and symlinks.
     """
-    def __init__(self, name, checksum, permissions):
+    __slots__ = ('name', 'checksum', 'permissions', '_raw')
+    # One-letter type code, cheaper to test than ``isinstance`` on hot paths.
+    kind = None
+
+    def __init__(self, name, checksum, permissions, raw_checksum=None):
         """
         Initializes the TreeNode class.
 
         :param name: Name to initialize.
         :param checksum: Checksum to initialize.
         :param permissions: Permissions to initialize.
+        :param raw_checksum: The 8 byte digest ``checksum`` is the hex form of, folded into the parent directory's checksum. Only given by the ``build_node`` methods, defaults to ``None``.
         """
         self.name = name
         self.checksum = checksum
         self.permissions = permissions
+        self._raw = raw_checksum
 
-    def to_dict(self):
+    def to_shallow_dict(self):
         """
-        Creates a dictionary equivalent of the given node type. Must be overriden by a child class to use.
+        Creates a dictionary equivalent of the given node type, listing a directory's children as nodes rather than dictionaries. Must be overriden by a child class to use.
 
         :raises NotImplementedError: on invocation without override.
         """
         raise NotImplementedError()
 
+    def to_dict(self):
+        """
+        Creates a dictionary equivalent of the given node type. Same as ``to_shallow_dict`` for nodes without children.
+        """
+        return self.to_shallow_dict()
+
     @staticmethod
     def build_node(path, name):
         """
@@ -41,15 +60,33 @@ class TreeNode:
         :params path: Path of data stored. Could be a file, symlink, or a directory.
         :params name: Name of data stored. Could be a file, symlink, or a directory.
         """
-        if os.path.islink(path):
-            return SymlinkNode.build_node(path, name)
-        elif os.path.isfile(path):
-            return FileNode.build_node(path, name)
-        elif os.path.isdir(path):
-            return DirectoryNode.build_node(path, name)
+        st = os.lstat(path)
+        if stat.S_ISLNK(st.st_mode):
+            return SymlinkNode.build_node(path, name, st)
+        elif stat.S_ISREG(st.st_mode):
+            return FileNode.build_node(path, name, st)
+        elif stat.S_ISDIR(st.st_mode):
+            return DirectoryNode.build_node(path, name, st)
         
         print('Could not backup: ' + path)
 
+    @staticmethod
+    def build_node_from_entry(entry, dir_fd=None):
+        """
+        Invokes the respective ``build_node`` method like ``build_node``, but reads the type and the stat result of the data from the ``os.DirEntry`` instead of querying the file system again.
+
+        :params entry: ``os.DirEntry`` of the data stored, as yielded by ``os.scandir``.
+        :params dir_fd: Open descriptor of the directory containing ``entry``. Defaults to ``None``.
+        """
+        if entry.is_symlink():
+            return SymlinkNode.build_node(entry.path, entry.name, entry.stat(follow_symlinks=False), dir_fd)
+        elif entry.is_file():
+            return FileNode.build_node(entry.path, entry.name, entry.stat(follow_symlinks=False), dir_fd)
+        elif entry.is_dir():
+            return DirectoryNode.build_node(entry.path, entry.name, entry.stat(follow_symlinks=False))
+
+        print('Could not backup: ' + entry.path)
+
     @staticmethod
     def from_dict(d):
         """
@@ -70,7 +107,10 @@ class TreeNode:
 
 
 class DirectoryNode(TreeNode):
-    def __init__(self, name, checksum, permissions, children):
+    __slots__ = ('children',)
+    kind = 'd'
+
+    def __init__(self, name, checksum, permissions, children, raw_checksum=None):
         """
         Initializes the DirectoryNode class.
 
@@ -78,52 +118,74 @@ class DirectoryNode(TreeNode):
         
         See TreeNode's ``__init__`` documentation for a description of remaining parameters.
         """
-        super().__init__(name, checksum, permissions)
+        super().__init__(name, checksum, permissions, raw_checksum)
         self.children = children
 
-    def to_dict(self):
+    def to_shallow_dict(self):
         """
         Provides various properties of the directory, packaging them into a dictionary.
 
-        Returns the ``name``, ``checksum``, ``permissions``, ``type``, and the node's children, recursively.
+        Returns the ``name``, ``checksum``, ``permissions``, ``type``, and the list of the node's children.
         """
         return {
                 'name': self.name,
                 'checksum': self.checksum,
                 'permissions': self.permissions,
-                'children': [child.to_dict() for child in self.children.values()],
+                'children': list(self.children.values()),
                 'type': 'directory',
                }
 
+    def to_dict(self):
+        """
+        Provides various properties of the directory, packaging them into a dictionary, with the node's children converted recursively.
+        """
+        d = self.to_shallow_dict()
+        d['children'] = [child.to_dict() for child in d['children']]
+        return d
+
     @staticmethod
-    def build_node(path, name):
+    def build_node(path, name, st=None):
         """
         Builds a directory node using the given name and fetching the permissions & checksum of the directory at given path.
 
-        Obtains the permission of the directory. Constructs the children of the directory as a dictionary, looping over the contents of the given ``path``. Generates a checksum on the basis of the children of the directory. Returns a ``DirectoryNode`` built with these parameters.
+        Obtains the permission of the directory. Constructs the children of the directory as a dictionary, scanning the contents of the given ``path`` with ``os.scandir``; files are hashed concurrently on ``_POOL`` while subdirectories are walked on the calling thread. Where supported, files and symlinks are opened relative to a descriptor of the directory, sparing the kernel a full path lookup per child. Generates a checksum from the concatenated raw digests of the children of the directory, ordered by name. Returns a ``DirectoryNode`` built with these parameters.
         
         :params path: The directory's path which needs to be made into a node.
         :params name: The name of the directory.
+        :params st: The ``os.lstat`` result of ``path``, if already known. Defaults to ``None``, in which case it is fetched.
         """
-        assert os.path.isdir(path)
+        if st is None:
+            st = os.lstat(path)
+        assert stat.S_ISDIR(st.st_mode)
 
-        permissions = stat.S_IMODE(os.lstat(path).st_mode)
+        permissions = stat.S_IMODE(st.st_mode)
 
         children = dict()
-        for child_name in os.listdir(path):
-            child_path = os.path.join(path, child_name)
-            if not os.path.isfile(child_path) and not os.path.isdir(child_path):
-                print("Ignored: " + child_path)
-                continue
-            children[child_name] = TreeNode.build_node(child_path, child_name)
-
-        child_checksums = [children[child_name].checksum for child_name in sorted(children.keys())]
-        message = xxhash.xxh64()
-        for child_digest in child_checksums:
-            message.update(child_digest)
-        checksum = message.hexdigest()
-
-        return DirectoryNode(name, checksum, permissions, children)
+        dir_fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY) if _SUPPORTS_DIR_FD else None
+        try:
+            for entry in os.scandir(path):
+                if not entry.is_file() and not entry.is_dir():
+                    print("Ignored: " + entry.path)
+                    continue
+                if entry.is_file(follow_symlinks=False):
+                    children[entry.name] = _POOL.submit(TreeNode.build_node_from_entry, entry, dir_fd)
+                else:
+                    children[entry.name] = TreeNode.build_node_from_entry(entry, dir_fd)
+            for child_name, child in children.items():
+                if isinstance(child, Future):
+                    children[child_name] = child.result()
+        finally:
+            if dir_fd is not None:
+                # if the scan failed half way, skip the queued files; those already running still read through dir_fd
+                pending = [child for child in children.values() if isinstance(child, Future)]
+                for child in pending:
+                    child.cancel()
+                wait(pending)
+                os.close(dir_fd)
+
+        raw_checksum = xxhash.xxh3_64_digest(b''.join([children[child_name]._raw for child_name in sorted(children)]))
+
+        return DirectoryNode(name, raw_checksum.hex(), permissions, children, raw_checksum)
 
     @staticmethod
     def from_dict(d):
@@ -136,7 +198,24 @@ class DirectoryNode(TreeNode):
 
 
 class FileNode(TreeNode):
-    def to_dict(self):
+    __slots__ = ('size',)
+    kind = 'f'
+
+    FADVISE_THRESHOLD = 1 << 20
+    BLOCKSIZE = 1 << 20
+
+    def __init__(self, name, checksum, permissions, raw_checksum=None, size=None):
+        """
+        Initializes the FileNode class.
+
+        :params size: Size of the file in bytes when it was hashed. Only given by ``build_node``, defaults to ``None``.
+
+        See TreeNode's ``__init__`` documentation for a description of remaining parameters.
+        """
+        super().__init__(name, checksum, permissions, raw_checksum)
+        self.size = size
+
+    def to_shallow_dict(self):
         """
         Provides various properties of the file to be packaged into a dictionary.
 
@@ -150,31 +229,42 @@ class FileNode(TreeNode):
                }
 
     @staticmethod
-    def build_node(path, name):
+    def build_node(path, name, st=None, dir_fd=None):
         """
         Builds a file node using the given name and fetching the permissions & checksum of the file at given path.
 
         Obtains the permission of the file. Generates a checksum from the contents of the file. Returns a ``FileNode`` built with these parameters.
+
+        The file is read through a single buffer of at most ``BLOCKSIZE`` bytes, advising the kernel of the sequential read for files of at least ``FADVISE_THRESHOLD`` bytes.
         
         :params path: The file's path which needs to be made into a node.
         :params name: The name of the file.
+        :params st: The ``os.lstat`` result of ``path``, if already known. Defaults to ``None``, in which case it is fetched.
+        :params dir_fd: Open descriptor of the directory containing the file, which ``name`` is then resolved against instead of ``path``. Defaults to ``None``.
         """
-        assert os.path.isfile(path)
-        assert not os.path.islink(path)
+        if st is None:
+            st = os.lstat(path)
+        assert stat.S_ISREG(st.st_mode)
 
-        permissions = stat.S_IMODE(os.lstat(path).st_mode)
+        permissions = stat.S_IMODE(st.st_mode)
 
-        BLOCKSIZE = 65536
+        fd = os.open(path, os.O_RDONLY) if dir_fd is None else os.open(name, os.O_RDONLY, dir_fd=dir_fd)
+        try:
+            if _HAS_FADVISE and st.st_size >= FileNode.FADVISE_THRESHOLD:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
 
-        message = xxhash.xxh64()
-        with open(path, 'rb') as f:
-            file_buffer = f.read(BLOCKSIZE)
-            while len(file_buffer) > 0:
-                message.update(file_buffer)
-                file_buffer = f.read(BLOCKSIZE)
-        checksum = message.hexdigest()
+            message = xxhash.xxh3_64()
+            file_buffers = [bytearray(min(st.st_size, FileNode.BLOCKSIZE) or FileNode.BLOCKSIZE)]
+            file_view = memoryview(file_buffers[0])
+            read_size = os.readv(fd, file_buffers)
+            while read_size:
+                message.update(file_view[:read_size])
+                read_size = os.readv(fd, file_buffers)
+            raw_checksum = message.digest()
+        finally:
+            os.close(fd)
 
-        return FileNode(name, checksum, permissions)
+        return FileNode(name, raw_checksum.hex(), permissions, raw_checksum, st.st_size)
 
     @staticmethod
     def from_dict(d):
@@ -187,7 +277,10 @@ class FileNode(TreeNode):
 
 
 class SymlinkNode(TreeNode):
-    def to_dict(self):
+    __slots__ = ()
+    kind = 'l'
+
+    def to_shallow_dict(self):
         """
         Provides various properties of the symlink to be packaged into a dictionary.
 
@@ -201,7 +294,7 @@ class SymlinkNode(TreeNode):
                }
 
     @staticmethod
-    def build_node(path, name):
+    def build_node(path, name, st=None, dir_fd=None):
         """
         Builds a symlink node using the given name and fetching the permissions & checksum of the symlink at given path.
 
@@ -209,16 +302,19 @@ class SymlinkNode(TreeNode):
         
         :params path: The symlink's path which needs to be made into a node.
         :params name: The name of the symlink.
+        :params st: The ``os.lstat`` result of ``path``, if already known. Defaults to ``None``, in which case it is fetched.
+        :params dir_fd: Open descriptor of the directory containing the symlink, which ``name`` is then resolved against instead of ``path``. Defaults to ``None``.
         """
-        assert os.path.islink(path)
+        if st is None:
+            st = os.lstat(path)
+        assert stat.S_ISLNK(st.st_mode)
 
-        permissions = stat.S_IMODE(os.lstat(path).st_mode)
+        permissions = stat.S_IMODE(st.st_mode)
 
-        message = xxhash.xxh64()
-        message.update(os.readlink(path))
-        checksum = message.hexdigest()
+        target = os.readlink(path) if dir_fd is None else os.readlink(name, dir_fd=dir_fd)
+        raw_checksum = xxhash.xxh3_64_digest(os.fsencode(target))
 
-        return SymlinkNode(name, checksum, permissions)
+        return SymlinkNode(name, raw_checksum.hex(), permissions, raw_checksum)
 
     @staticmethod
     def from_dict(d):
@@ -230,23 +326,42 @@ class SymlinkNode(TreeNode):
         return SymlinkNode(d['name'], d['checksum'], d['permissions'])
 
 
+def _encode_tree_node(node):
+    """
+    Serializes a single node for ``Checkpoint.to_json``; the children of a directory are returned as nodes, for the encoder to pass back here in turn.
+
+    :param node: Node to serialize.
+
+    :raises TypeError: If ``node`` is not a ``TreeNode``.
+    """
+    if isinstance(node, TreeNode):
+        return node.to_shallow_dict()
+
+    raise TypeError('Cannot serialize ' + type(node).__name__)
+
+
 class Checkpoint:
     """
     Checkpoint class 
     """
-    def __init__(self, root, time=None, name=None):
+    # Bumped whenever the way checksums are computed changes. Checkpoints without a version are version 1.
+    FORMAT_VERSION = 2
+
+    def __init__(self, root, time=None, name=None, version=None):
         """
         Initializes a Checkpoint object using given parameters.
 
         :params root: The root on which a suitable ``node`` is to be built.
         :params time: Initializes time as either given value or the current time.
         :params name: Name for the ``Checkpoint`` object. Defaults to ``None``.
+        :params version: Format version the checksums of ``root`` were computed with. Defaults to ``FORMAT_VERSION``.
         """
-        assert name is None or re.match('^[a-zA-Z0-9_\-.]+$', name)
+        assert name is None or _NAME_RE.match(name)
 
         self.root = root
         self.time = datetime.now() if time is None else time
         self.name = name
+        self.version = self.FORMAT_VERSION if version is None else version
 
     @property
     def meta(self):
@@ -258,21 +373,25 @@ class Checkpoint:
     def to_json(self):
         """
         Dumps the ``Checkpoint`` into a JSON string.
+
+        The tree is handed to the encoder as nodes, which ``_encode_tree_node`` serializes one at a time, so no dictionary of the whole tree is built up front.
         """
-        return json.dumps(dict(root=self.root.to_dict(), time=self.time.isoformat(), name=self.name), indent=2)
+        return json_dumps(dict(root=self.root, time=self.time.isoformat(), name=self.name, version=self.version), default=_encode_tree_node, pretty=True)
 
     def iter(self):
         """
         Iterates over the root of the Checkpoint, entering the directories iteratively in a LIFO manner.
+
+        Yields each node along with the tuple of names leading to it from the root, empty for the root itself. No path strings are built; callers needing one join the parts, e.g. ``os.path.join(base_path, *parts)``.
         """
-        stack = [(self.root, '')]
-        while len(stack):
-            current_node, current_path = stack.pop()
-            yield current_node, current_path
+        stack = [(self.root, ())]
+        while stack:
+            current_node, current_parts = stack.pop()
+            yield current_node, current_parts
 
-            if isinstance(current_node, DirectoryNode):
+            if current_node.kind == 'd':
                 for child_name, child_node in current_node.children.items():
-                    stack.append((child_node, os.path.join(current_path, child_name)))
+                    stack.append((child_node, current_parts + (child_name,)))
 
     @staticmethod
     def build_checkpoint(path, name=None):
@@ -291,10 +410,16 @@ class Checkpoint:
         Builds a ``Checkpoint`` from a given JSON string.
 
         :param json_str: JSON string to be loaded.
+
+        :raises ValueError: If the checkpoint was written by a newer format version.
         """
-        tree_dict = json.loads(json_str)
+        tree_dict = json_loads(json_str)
+
+        version = tree_dict.get('version', 1)
+        if version > Checkpoint.FORMAT_VERSION:
+            raise ValueError('Unsupported checkpoint version: ' + str(version))
 
-        return Checkpoint(TreeNode.from_dict(tree_dict['root']), time=datetime_from_iso_format(tree_dict['time']), name=tree_dict['name'])
+        return Checkpoint(TreeNode.from_dict(tree_dict['root']), time=datetime_from_iso_format(tree_dict['time']), name=tree_dict['name'], version=version)
 
 
 class CheckpointMeta:
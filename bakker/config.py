@@ -1,7 +1,17 @@
+from functools import lru_cache
 import json
 import os
 
 from bakker.storage import FileSystemStorage
+from bakker.utils import json_dumps
+
+
+@lru_cache(maxsize=None)
+def _split_key(key):
+    """
+    Splits a dotted ``key`` into its parts. Memoized, as the same few keys are looked up over and over.
+    """
+    return tuple(key.split('.'))
 
 
 class Config:
@@ -9,6 +19,8 @@ class Config:
     Config class provides methods to deal with configuration file for Bakker. 
     
     Enables the ability to create, save, and read the config.json file. Can also read, write, and modify individual JSON key-value pairs in the configuration file.
+
+    Changes are saved right away, unless made inside a ``with config:`` block, in which case they are saved once on leaving it.
     """
     USER_DIR = os.path.expanduser('~')
     CONFIG_FILE = os.path.join(USER_DIR, '.bakker/config.json')
@@ -17,20 +29,49 @@ class Config:
         """
         Opens up the configuration file in read mode, loading it into the config variable. If the file does not exist, the config variable is initialized as an empty JSON object.
         """
+        self._config_dir_exists = os.path.isdir(os.path.dirname(self.CONFIG_FILE))
+        self._batch_depth = 0
+        self._dirty = False
         if os.path.isfile(self.CONFIG_FILE):
             with open(self.CONFIG_FILE, 'r') as f:
                 self.config = json.load(f)
         else:
             self.config = {}
 
+    def __enter__(self):
+        """
+        Starts a batch of changes, deferring ``_save`` until the outermost batch is left.
+        """
+        self._batch_depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Ends a batch of changes, saving the config once if any change was made during the outermost batch.
+        """
+        self._batch_depth -= 1
+        if self._batch_depth == 0 and self._dirty:
+            self._save()
+
     def _save(self):
         """
-        Writes config variable to the JSON file.
+        Writes config variable to the JSON file, or marks it as dirty while inside a batch.
         """
-        if not os.path.exists(os.path.dirname(self.CONFIG_FILE)):
-            os.makedirs(os.path.dirname(self.CONFIG_FILE))
-        with open(self.CONFIG_FILE, 'w') as f:
-            json.dump(self.config, f)
+        if self._batch_depth:
+            self._dirty = True
+            return
+        self._dirty = False
+
+        if not self._config_dir_exists:
+            os.makedirs(os.path.dirname(self.CONFIG_FILE), exist_ok=True)
+            self._config_dir_exists = True
+        data = memoryview(json_dumps(self.config).encode())
+        fd = os.open(self.CONFIG_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            while data:
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)
 
     def __setitem__(self, key, value):
         """
@@ -41,7 +82,7 @@ class Config:
         """
         assert isinstance(value, str)
 
-        keys = key.split('.')
+        keys = _split_key(key)
         current = self.config
         for key in keys[:-1]:
             current = current.setdefault(key, {})
@@ -58,7 +99,7 @@ class Config:
 
         :raises KeyError: If the node reached is not a string, in which case it is not a key but a value.
         """
-        keys = key.split('.')
+        keys = _split_key(key)
         current = self.config
         for key in keys:
             current = current[key]
@@ -70,24 +111,21 @@ class Config:
         """
         Deletes the given ``key`` and all the stored values inside it, subsequently saving the configuration.
 
+        Parent objects left empty by the deletion are removed as well.
+
         :param key: The variable which is to be deleted.
         """
-        def del_dict_item(d, keys):
-            """
-            Recursively deletes the ``keys`` from a given dictionary ``d``.
-
-            :param d: Dictionary from which the deletion is to be done.
-            :param keys: The keys which need to be deleted from the dictionary.
-            """
-            if len(keys) > 1:
-                del_dict_item(d[keys[0]], keys[1:])
-                if len(d[keys[0]]) == 0:
-                    del d[keys[0]]
-            else:
-                del d[keys[0]]
-
-        keys = key.split('.')
-        del_dict_item(self.config, keys)
+        keys = _split_key(key)
+        parents = []
+        current = self.config
+        for key in keys[:-1]:
+            parents.append((current, key))
+            current = current[key]
+        del current[keys[-1]]
+        for parent, key in reversed(parents):
+            if parent[key]:
+                break
+            del parent[key]
         self._save()
 
     def __contains__(self, key):
@@ -5,6 +5,19 @@ import shutil
 from bakker.checkpoint import Checkpoint, FileNode, SymlinkNode, DirectoryNode, CheckpointMeta
 
 
+_HAS_FADVISE = hasattr(os, 'posix_fadvise')
+
+
+def _drop_page_cache(file_path):
+    """ Advises the kernel to drop the cached pages of the file at ``file_path``.
+    """
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
 class Storage(ABC):
     @abstractmethod
     def has_file(self, checksum):
@@ -31,23 +44,29 @@ class Storage(ABC):
         pass
 
     def store(self, src_dir_path, checkpoint):
-        for node, relative_node_path in checkpoint.iter():
-            absolute_node_path = os.path.join(src_dir_path, relative_node_path)
-            if isinstance(node, FileNode) and not self.has_file(node.checksum):
-                self.store_file(absolute_node_path, node.checksum)
+        for node, relative_node_parts in checkpoint.iter():
+            if isinstance(node, FileNode):
+                is_stored = self.has_file(node.checksum)
+                # large files are done with once stored, so their pages need not crowd the page cache
+                drop_pages = _HAS_FADVISE and node.size is not None and node.size >= FileNode.FADVISE_THRESHOLD
+                if not is_stored or drop_pages:
+                    absolute_node_path = os.path.join(src_dir_path, *relative_node_parts)
+                    if not is_stored:
+                        self.store_file(absolute_node_path, node.checksum)
+                    if drop_pages:
+                        _drop_page_cache(absolute_node_path)
             elif isinstance(node, SymlinkNode) and not self.has_file(node.checksum):
-                self.store_file(absolute_node_path, node.checksum)
+                self.store_file(os.path.join(src_dir_path, *relative_node_parts), node.checksum)
 
         self.store_checkpoint(checkpoint)
 
     def retrieve(self, dst_dir_path, checkpoint_meta):
         checkpoint = self.retrieve_checkpoint(checkpoint_meta)
-        for item, relative_item_path in checkpoint.iter():
-            item_path = os.path.join(dst_dir_path, relative_item_path)
+        for item, relative_item_parts in checkpoint.iter():
+            item_path = os.path.join(dst_dir_path, *relative_item_parts)
             if isinstance(item, DirectoryNode) and not os.path.exists(item_path):
                 os.mkdir(item_path, item.permissions)
             if isinstance(item, SymlinkNode) or isinstance(item, FileNode):
-                item_path = os.path.join(dst_dir_path, relative_item_path)
                 self.retrieve_file(item.checksum, item_path, item.permissions)
 
     def retrieve_by_checksum(self, dst_dir_path, checksum):
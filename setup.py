@@ -29,10 +29,10 @@ setup(
     python_requires='>=3.5',
     setup_requires=[],
     install_requires=[
-        'xxhash==1.3.0',
+        'xxhash==2.0.2',
         'Click==7.0',
     ],
-    extras_require={},
+    extras_require={'orjson': ['orjson==3.8.3']},
     include_package_data=True,
     classifiers=[
         'License :: OSI Approved :: MIT License',
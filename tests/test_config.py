@@ -77,5 +77,21 @@ class TestConfig(unittest.TestCase):
         items = list(config.items())
         self.assertCountEqual(comparision_items, items)
 
+    def testBatch(self):
+        config_path = os.path.join(self.tmp_config_path, 'nested/test_batch_config.json')
+        config = self.TestConfig(config_path)
+        with config:
+            config['first.path1'] = 'value1'
+            with config:
+                config['first.path2'] = 'value2'
+            config['second'] = 'value3'
+            del config['first.path1']
+            self.assertFalse(os.path.exists(config_path))
+
+        saved_config = self.TestConfig(config_path)
+        self.assertEqual(saved_config['first.path2'], 'value2')
+        self.assertEqual(saved_config['second'], 'value3')
+        self.assertNotIn('first.path1', saved_config)
+
     def tearDown(self):
         self.tmp_config_dir.cleanup()
@@ -23,12 +23,10 @@ class TestFileSystemStorage(unittest.TestCase):
                 if os.path.isdir(file_path):
                     yield from dfs_file_checksums(file_path)
                 elif os.path.islink(file_path):
-                    message = xxhash.xxh64()
-                    message.update(os.readlink(file_path))
-                    yield message.hexdigest()
+                    yield xxhash.xxh3_64_hexdigest(os.fsencode(os.readlink(file_path)))
                 elif os.path.isfile(file_path):
                     BLOCKSIZE = 65536
-                    message = xxhash.xxh64()
+                    message = xxhash.xxh3_64()
                     with open(file_path, 'rb') as f:
                         file_buffer = f.read(BLOCKSIZE)
                         while len(file_buffer) > 0:
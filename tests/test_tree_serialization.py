@@ -1,6 +1,10 @@
+import json
 import os
+import tempfile
 import unittest
+from unittest import mock
 
+from bakker import utils
 from bakker.checkpoint import Checkpoint, DirectoryNode
 
 
@@ -19,6 +23,49 @@ class TestTreeSerialization(unittest.TestCase):
         new_tree = Checkpoint.from_json(self.tree.to_json())
         self.assertIsInstance(new_tree, Checkpoint)
 
+    def test_serialized_version(self):
+        new_tree = Checkpoint.from_json(self.tree.to_json())
+        self.assertEqual(new_tree.version, Checkpoint.FORMAT_VERSION)
+
+    def test_unversioned_checkpoint(self):
+        tree_dict = json.loads(self.tree.to_json())
+        del tree_dict['version']
+        legacy_tree = Checkpoint.from_json(json.dumps(tree_dict))
+        self.assertEqual(legacy_tree.version, 1)
+        self.check_tree_nodes(self.tree.root, legacy_tree.root)
+
+    def test_unsupported_version(self):
+        newer_tree = Checkpoint(self.tree.root, name=self.tree.name, version=Checkpoint.FORMAT_VERSION + 1)
+        with self.assertRaises(ValueError):
+            Checkpoint.from_json(newer_tree.to_json())
+
+    def test_serialized_structure_without_orjson(self):
+        with mock.patch.object(utils, 'orjson', None):
+            new_tree = Checkpoint.from_json(self.tree.to_json())
+        self.check_tree_nodes(self.tree.root, new_tree.root)
+
+    def test_non_utf8_name(self):
+        with tempfile.TemporaryDirectory() as tmp_path:
+            with open(os.path.join(os.fsencode(tmp_path), b'bad\xff'), 'w') as f:
+                f.write('content')
+            tree = Checkpoint.build_checkpoint(tmp_path)
+
+        new_tree = Checkpoint.from_json(tree.to_json())
+        self.assertIn(os.fsdecode(b'bad\xff'), new_tree.root.children)
+        self.check_tree_nodes(tree.root, new_tree.root)
+
+        # checkpoints written by the standard json module escape the surrogates
+        legacy_tree = Checkpoint.from_json(json.dumps(json.loads(tree.to_json())))
+        self.check_tree_nodes(tree.root, legacy_tree.root)
+
+    def test_deep_tree(self):
+        with tempfile.TemporaryDirectory() as tmp_path:
+            os.makedirs(os.path.join(tmp_path, *['d'] * 130))
+            tree = Checkpoint.build_checkpoint(tmp_path)
+
+        new_tree = Checkpoint.from_json(tree.to_json())
+        self.check_tree_nodes(tree.root, new_tree.root)
+
     def test_serialized_structure(self):
         new_tree = Checkpoint.from_json(self.tree.to_json())
         self.check_tree_nodes(self.tree.root, new_tree.root)
@@ -26,6 +73,7 @@ class TestTreeSerialization(unittest.TestCase):
     def check_tree_nodes(self, tree_node_a, tree_node_b):
         self.assertEqual(tree_node_a.name, tree_node_b.name)
         self.assertEqual(tree_node_a.__class__, tree_node_b.__class__)
+        self.assertEqual(tree_node_a.checksum, tree_node_b.checksum)
 
         if isinstance(tree_node_a, DirectoryNode):
             for name, child_node_a in tree_node_a.children.items():